@@ -4,6 +4,9 @@ import numpy as np
 from baghchal.env import Board
 from baghchal.lookup_table import action_space, reversed_action_space
 
+# Action index -> move string, as a flat tuple for a plain indexed read per step
+REV_ACTIONS = tuple(reversed_action_space[i] for i in range(len(reversed_action_space)))
+
 class BaghChalEnv(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array", "ansi"], "render_fps": 4}
 
@@ -18,6 +21,8 @@ class BaghChalEnv(gym.Env):
         # 4: turn (1 if Goat)
         self.observation_space = spaces.Box(low=0, high=20, shape=(5, 5, 5), dtype=np.float64)
         self.render_mode = render_mode
+        # Action mask of the current position, shared by step() and _get_info()
+        self._mask = None
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
@@ -28,7 +33,7 @@ class BaghChalEnv(gym.Env):
 
     def step(self, action):
         # Convert discrete action to move string
-        move_str = reversed_action_space[action]
+        move_str = REV_ACTIONS[action]
         
         # Check validity using the board's internal check or try/except
         # Note: baghchal library's validate raises Exception. 
@@ -37,7 +42,10 @@ class BaghChalEnv(gym.Env):
         # It's better to check if it's in possible moves to avoid exceptions and for RL safety
         # However, mapping string move back to the vector index is what action_space does.
         # So we can check if action is valid via mask.
-        mask = self.board.possible_moves_vector()
+        # The mask of the current position was already computed for the last info dict.
+        if self._mask is None:
+            self._mask = self.board.possible_moves_vector()
+        mask = self._mask
         
         terminated = False
         truncated = False
@@ -64,41 +72,50 @@ class BaghChalEnv(gym.Env):
             reward = -100 # Heavy penalty
         else:
             # Valid move
-            current_turn = self.board.next_turn
-            try:
-                # The move string from lookup table might be short "11" (placement) 
-                # or long "1112" (move). baghchal env handles this via `pure_move` or `move`
-                # pure_move adds the 'G' or 'B' prefix.
-                
-                # reversed_action_space gives raw coordinates e.g., '11' or '1112'
-                # The `pure_move` method in Board handles adding the prefix based on turn.
-                self.board.pure_move(move_str)
-                
-                # Check for win/loss
-                if self.board.is_game_over():
-                    terminated = True
-                    winner = self.board.winner()
-                    if winner == current_turn:
-                        reward = 100
-                    elif winner == "Draw": # specific check needed? board.winner returns 0 for draw?
-                         reward = 0
-                    else:
-                        reward = -100
-                        
-            except Exception as e:
-                # This should ideally not happen if mask[action] == 1
-                print(f"Error executing move {move_str}: {e}")
-                terminated = True
-                reward = -100
+            reward, terminated = self._apply_move(move_str)
 
         observation = self.board.board_repr()
-        info = self._get_info()
+        # _apply_move clears the cached mask; after an invalid action it still applies
+        info = self._get_info(mask=self._mask)
 
         if self.render_mode == "human":
             self.render()
 
         return observation, reward, terminated, truncated, info
 
+    def _apply_move(self, move_str):
+        """Play a move already known to be valid, returning (reward, terminated)."""
+        terminated = False
+        reward = 0
+        current_turn = self.board.next_turn
+        self._mask = None
+        try:
+            # The move string from lookup table might be short "11" (placement) 
+            # or long "1112" (move). baghchal env handles this via `pure_move` or `move`
+            # pure_move adds the 'G' or 'B' prefix.
+            
+            # reversed_action_space gives raw coordinates e.g., '11' or '1112'
+            # The `pure_move` method in Board handles adding the prefix based on turn.
+            self.board.pure_move(move_str)
+            
+            # Check for win/loss
+            if self.board.is_game_over():
+                terminated = True
+                winner = self.board.winner()
+                if winner == current_turn:
+                    reward = 100
+                elif winner == "Draw": # specific check needed? board.winner returns 0 for draw?
+                     reward = 0
+                else:
+                    reward = -100
+                    
+        except Exception as e:
+            # This should ideally not happen if mask[action] == 1
+            print(f"Error executing move {move_str}: {e}")
+            terminated = True
+            reward = -100
+        return reward, terminated
+
     def render(self):
         if self.render_mode == "ansi" or self.render_mode == "human":
             self.board.lightweight_show_board()
@@ -108,10 +125,13 @@ class BaghChalEnv(gym.Env):
             # For now, let's stick to simple text or implement PIL to array later if needed.
             pass
 
-    def _get_info(self):
+    def _get_info(self, mask=None):
+        if mask is None:
+            mask = self.board.possible_moves_vector()
+        self._mask = mask
         return {
             "turn": self.board.next_turn,
-            "action_mask": self.board.possible_moves_vector(),
+            "action_mask": mask,
             "pgn": self.board.pgn,
             "fen": self.board.fen
         }
@@ -1,15 +1,33 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 import uuid
+import asyncio
+import concurrent.futures
+from contextlib import asynccontextmanager
 from typing import Dict, Optional
 import os
+import pickle
+import orjson
 
 from baghchal.env import Board
 from baghchal.engine import Engine
 from .api_models import GameConfig, MoveRequest, GameState, LoadGameRequest
+from .search import zobrist_hash, tt_probe, tt_store, tt_best_move, bot_think
+from . import moves
+from .store import GameStore
 
-app = FastAPI(title="Bagh Chal API")
+# Minimax is pure Python and holds the GIL, so searches run in worker processes
+# to keep the event loop responsive and let concurrent bot moves use all cores
+EXECUTOR = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    EXECUTOR.shutdown(cancel_futures=True)
+
+app = FastAPI(title="Bagh Chal API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -20,67 +38,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory store
-games: Dict[str, Dict] = {}
+# In-memory store; inactive games expire after an hour
+games: GameStore = GameStore(maxsize=10_000, ttl=3600)
+
+# Pre-encoded body for the most common error response
+GAME_NOT_FOUND_BODY = orjson.dumps({"detail": "Game not found"})
+
+def game_not_found() -> Response:
+    return Response(content=GAME_NOT_FOUND_BODY, status_code=404, media_type="application/json")
+
+# Guards the transposition table shared by concurrent bot-move requests
+tt_lock = asyncio.Lock()
+
+# Wall-clock budget (seconds) after which iterative deepening stops going deeper
+BOT_TIME_BUDGET = 10.0
+
+def new_game(board: Board, engine: Engine, config: GameConfig) -> Dict:
+    return {
+        "board": board,
+        "engine": engine,
+        "config": config,
+        # One (move, squares, prev_pgn_len, prev_zobrist) record per ply, for O(1) undo
+        "undo_stack": [],
+        "zobrist": zobrist_hash(board)
+    }
 
-def get_game_state(game_id: str, board: Board, message: Optional[str] = None) -> GameState:
+def apply_move(game: Dict, move: str) -> None:
+    game["zobrist"], record = moves.make_move(game["board"], move, game["zobrist"])
+    game["undo_stack"].append(record)
+
+def revert_move(game: Dict) -> str:
+    record = game["undo_stack"].pop()
+    game["zobrist"] = moves.unmake_move(game["board"], record)
+    return record[0]
+
+def get_game_state(game_id: str, board: Board, message: Optional[str] = None) -> Response:
+    # Serve the previously serialized state if nothing changed since (e.g. frontend polling).
+    # The PGN pins down the full move history, so it also covers repetition draws.
+    game = games.get(game_id)
+    fen, pgn = board.fen, board.pgn
+    cache_key = (fen, pgn, message)
+    if game is not None:
+        cached = game.get("state_cache")
+        if cached is not None and cached[0] == cache_key:
+            return Response(content=cached[1], media_type="application/json")
+
+    # is_game_over() rescans the board (trapped tigers, repetitions), so evaluate it once
+    over = board.is_game_over()
     winner = None
-    if board.is_game_over():
+    if over:
         try:
             winner = str(board.winner())
         except:
             winner = "Draw"
 
     # Serialize board for frontend
-    # Board object is not directly serializable, need to convert to list of lists of strings/ints
-    board_data = [[str(c) if c != 0 else "" for c in row] for row in board.board]
-
-    return GameState(
+    # Board object is not directly serializable, need to convert to list of lists of strings/ints.
+    # Fill only the occupied cells from the piece point sets instead of str()-ing all 25 cells.
+    board_data = [[""] * 5 for _ in range(5)]
+    for x, y in board.goat_points:
+        board_data[x - 1][y - 1] = "G"
+    for x, y in board.bagh_points:
+        board_data[x - 1][y - 1] = "B"
+
+    # Resolve the remaining attributes once; baghs_trapped is a property that rescans the tigers
+    turn, goats_placed, goats_captured = board.next_turn, board.goats_placed, board.goats_captured
+    baghs_trapped = board.baghs_trapped
+
+    state = GameState(
         board=board_data,
-        turn=board.next_turn,
-        goats_placed=board.goats_placed,
-        goats_captured=board.goats_captured,
-        baghs_trapped=board.baghs_trapped,
-        game_over=board.is_game_over(),
+        turn=turn,
+        goats_placed=goats_placed,
+        goats_captured=goats_captured,
+        baghs_trapped=baghs_trapped,
+        game_over=over,
         winner=winner,
-        fen=board.fen,
-        pgn=board.pgn,
-        possible_moves=list(board.possible_moves()) if not board.is_game_over() else [],
+        fen=fen,
+        pgn=pgn,
+        possible_moves=list(board.possible_moves()) if not over else [],
         message=message
     )
 
+    content = state.model_dump_json().encode()
+    if game is not None:
+        game["state_cache"] = (cache_key, content)
+    return Response(content=content, media_type="application/json")
+
 @app.post("/api/games", response_model=Dict[str, str])
 async def create_game(config: GameConfig):
     game_id = str(uuid.uuid4())
     board = Board()
     engine = Engine(depth=config.difficulty)
-    games[game_id] = {
-        "board": board,
-        "engine": engine,
-        "config": config
-    }
-    return {"game_id": game_id}
+    games[game_id] = new_game(board, engine, config)
+    return Response(content=orjson.dumps({"game_id": game_id}), media_type="application/json")
 
 @app.get("/api/games/{game_id}", response_model=GameState)
 async def get_game(game_id: str):
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    game = games.get(game_id)
+    if game is None:
+        return game_not_found()
 
-    game = games[game_id]
     return get_game_state(game_id, game["board"])
 
 @app.post("/api/games/{game_id}/move", response_model=GameState)
 async def make_move(game_id: str, move_req: MoveRequest):
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    game = games.get(game_id)
+    if game is None:
+        return game_not_found()
 
-    game = games[game_id]
     board = game["board"]
 
     try:
-        # Use pure_move to handle simplified coordinates (e.g. "11", "1112")
-        # and automatically detect captures vs moves.
-        board.pure_move(move_req.move)
+        # Expand simplified coordinates (e.g. "11", "1112") the way pure_move does,
+        # automatically detecting captures vs moves.
+        apply_move(game, moves.expand_pure_move(board, move_req.move))
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -89,18 +160,47 @@ async def make_move(game_id: str, move_req: MoveRequest):
 
 @app.post("/api/games/{game_id}/bot-move", response_model=GameState)
 async def bot_move(game_id: str):
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    game = games.get(game_id)
+    if game is None:
+        return game_not_found()
 
-    game = games[game_id]
     board = game["board"]
     engine = game["engine"]
 
     if board.is_game_over():
         return get_game_state(game_id, board, message="Game over")
 
+    # Identify the position before any await: other requests (undo, seek, another
+    # bot move) may change the board while the search runs
+    h = game["zobrist"]
+    ply = len(game["undo_stack"])
+
+    try:
+        # Reuse a previous search of this exact position if it was at least as deep
+        async with tt_lock:
+            entry = tt_probe(h, engine.depth)
+            hint = tt_best_move(h)
+
+        if entry is not None:
+            best_move = entry[1]
+        else:
+            # Pickle here on the loop thread; the executor would otherwise pickle the
+            # live board later on its feeder thread, possibly mid-seek
+            snapshot = pickle.dumps(board)
+            loop = asyncio.get_running_loop()
+            best_move, score, depth = await loop.run_in_executor(
+                EXECUTOR, bot_think, snapshot, engine.depth, hint, BOT_TIME_BUDGET
+            )
+            if best_move:
+                async with tt_lock:
+                    tt_store(h, depth, best_move, score)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bot failed: {str(e)}")
+
+    if game["zobrist"] != h or len(game["undo_stack"]) != ply:
+        raise HTTPException(status_code=409, detail="Game changed while the bot was thinking")
+
     try:
-        best_move, _ = engine.get_best_move(board)
         # best_move returned by engine is a string like "1112" or "11" (no prefix?)
         # Let's verify what get_best_move returns.
         # Checking engine.py: it returns `best_move` which comes from `board.possible_moves()`.
@@ -108,7 +208,7 @@ async def bot_move(game_id: str):
         # So it should be directly usable in `board.move()`.
 
         if best_move:
-             board.move(best_move)
+             apply_move(game, best_move)
              msg = f"Bot played {best_move}"
         else:
              msg = "Bot has no moves (Game Over?)"
@@ -120,10 +220,10 @@ async def bot_move(game_id: str):
 
 @app.post("/api/games/{game_id}/undo", response_model=GameState)
 async def undo_move(game_id: str):
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    game = games.get(game_id)
+    if game is None:
+        return game_not_found()
 
-    game = games[game_id]
     board = game["board"]
     config = game["config"]
 
@@ -135,15 +235,15 @@ async def undo_move(game_id: str):
 
             # Undo at least once
             if board.no_of_moves_made > 0:
-                board.undo()
+                revert_move(game)
 
             # If it's still not the human's turn, undo again
             if board.no_of_moves_made > 0 and board.next_turn != config.human_side:
-                board.undo()
+                revert_move(game)
         else:
             # In PvP or CvC, just undo once per click
             if board.no_of_moves_made > 0:
-                board.undo()
+                revert_move(game)
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Undo failed: {str(e)}")
@@ -152,57 +252,56 @@ async def undo_move(game_id: str):
 
 @app.get("/api/games/{game_id}/seek/{move_index}", response_model=GameState)
 async def seek_to_move(game_id: str, move_index: int):
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    game = games.get(game_id)
+    if game is None:
+        return game_not_found()
 
-    game = games[game_id]
     original_board = game["board"]
+    moves_made = original_board.no_of_moves_made
+    move_index = max(0, min(move_index, moves_made))
+    message = f"Viewing move {move_index}"
+
+    if 2 * (moves_made - move_index) <= move_index:
+        # Closer to the live position: unwind it, serialize, then replay the same moves back.
+        # Nothing awaits in between, so no other request can observe the unwound board.
+        undone = [revert_move(game) for _ in range(moves_made - move_index)]
+        try:
+            return get_game_state(game_id, original_board, message=message)
+        finally:
+            for move in reversed(undone):
+                apply_move(game, move)
 
-    # Create a fresh board and replay moves
-    # We use a temporary board to avoid mutating the live game state
+    # Closer to the start: replay the opening moves on a temporary board
+    # to avoid mutating the live game state
     temp_board = Board()
-
-    # Get PGN moves
-    pgn = original_board.pgn
-    tokens = pgn.strip().split()
-    count = 0
-    target_tokens = []
-    for t in tokens:
-        if count >= move_index:
-            break
-        target_tokens.append(t)
-        if not t.endswith('.'):
-            count += 1
-    partial_pgn = " ".join(target_tokens)
     try:
-        if partial_pgn:
-            temp_board.pgn_converter(partial_pgn)
+        for move in original_board.moves[:move_index]:
+            temp_board.move(move)
     except Exception as e:
          raise HTTPException(status_code=400, detail=f"Failed to replay to move {move_index}: {str(e)}")
 
-
-    return get_game_state(game_id, temp_board, message=f"Viewing move {move_index}")
+    return get_game_state(game_id, temp_board, message=message)
 
 @app.post("/api/games/load", response_model=Dict[str, str])
 async def load_game(load_req: LoadGameRequest):
     game_id = str(uuid.uuid4())
-    board = Board()
+    parsed = Board()
 
     try:
         # pgn_converter is more robust than manual move replaying
-        board.pgn_converter(load_req.pgn)
+        parsed.pgn_converter(load_req.pgn)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to load game: {str(e)}")
 
 
     # Default engine for loaded games
     engine = Engine(depth=3)
-    games[game_id] = {
-        "board": board,
-        "engine": engine,
-        "config": GameConfig(mode="PvC", difficulty=3)
-    }
-    return {"game_id": game_id}
+    game = new_game(Board(), engine, GameConfig(mode="PvC", difficulty=3))
+    # Replay the parsed moves so the game has undo records for them
+    for move in parsed.moves:
+        apply_move(game, move)
+    games[game_id] = game
+    return Response(content=orjson.dumps({"game_id": game_id}), media_type="application/json")
 
 # Serve Frontend
 frontend_path = os.path.join(os.path.dirname(__file__), "../../frontend")
@@ -0,0 +1,98 @@
+from typing import Optional, Tuple
+
+from baghchal.env import Board, Goat, Bagh
+
+from .zobrist import (
+    PIECE_INDEX, ZOBRIST_PIECES, ZOBRIST_BAGH_TO_MOVE,
+    ZOBRIST_GOATS_PLACED, ZOBRIST_GOATS_CAPTURED,
+)
+
+Square = Tuple[int, int]
+# (move, from_sq, to_sq, captured_sq, prev_pgn_len, prev_zobrist)
+UndoRecord = Tuple[str, Optional[Square], Square, Optional[Square], int, int]
+
+def _square_index(sq: Square) -> int:
+    return (sq[0] - 1) * 5 + (sq[1] - 1)
+
+def parse_move(move: str) -> Tuple[Optional[Square], Square, Optional[Square]]:
+    """Split a full PGN move ("G33", "G3334", "B1122", "Bx1133") into from/to/captured squares."""
+    if len(move) == 3:
+        return None, (int(move[1]), int(move[2])), None
+    if len(move) == 6:
+        from_sq = (int(move[2]), int(move[3]))
+        to_sq = (int(move[4]), int(move[5]))
+        return from_sq, to_sq, ((from_sq[0] + to_sq[0]) // 2, (from_sq[1] + to_sq[1]) // 2)
+    return (int(move[1]), int(move[2])), (int(move[3]), int(move[4])), None
+
+def expand_pure_move(board: Board, move: str) -> str:
+    """Full PGN move for simplified coordinates ("11", "1112"), mirroring Board.pure_move."""
+    if len(move) == 2:
+        return f"G{move}"
+    x1, y1, x2, y2 = move
+    if (int(x1) - int(x2))**2 + (int(y1) - int(y2))**2 <= 2:
+        return f"{board.next_turn}{move}"
+    return f"{board.next_turn}x{move}"
+
+def make_move(board: Board, move: str, zobrist: int) -> Tuple[int, UndoRecord]:
+    """
+    Validate and play `move`, returning the updated Zobrist hash and a record for unmake_move.
+
+    The hash is updated from the squares the move touched rather than rehashing the board.
+    """
+    prev_pgn_len = len(board.pgn)
+    board.move(move)
+
+    from_sq, to_sq, captured_sq = parse_move(move)
+    piece = PIECE_INDEX[move[0]]
+    h = zobrist ^ ZOBRIST_BAGH_TO_MOVE
+    h ^= ZOBRIST_PIECES[_square_index(to_sq)][piece]
+    if from_sq is None:
+        h ^= ZOBRIST_GOATS_PLACED[board.goats_placed - 1] ^ ZOBRIST_GOATS_PLACED[board.goats_placed]
+    else:
+        h ^= ZOBRIST_PIECES[_square_index(from_sq)][piece]
+    if captured_sq is not None:
+        captured = min(board.goats_captured, 5)
+        h ^= ZOBRIST_PIECES[_square_index(captured_sq)][PIECE_INDEX["G"]]
+        h ^= ZOBRIST_GOATS_CAPTURED[captured - 1] ^ ZOBRIST_GOATS_CAPTURED[captured]
+
+    return h, (move, from_sq, to_sq, captured_sq, prev_pgn_len, zobrist)
+
+def unmake_move(board: Board, record: UndoRecord) -> int:
+    """
+    Revert the last move played with make_move, returning the previous Zobrist hash.
+
+    Only the touched squares and counters are restored, unlike Board.undo which
+    replays the whole game from the start.
+    """
+    move, from_sq, to_sq, captured_sq, prev_pgn_len, prev_zobrist = record
+
+    # Position bookkeeping (repetition counts are only tracked once all goats are placed)
+    fen = board.fen_history.pop()
+    if board.no_of_goat_moves >= 20:
+        key = fen.split(" ")[0]
+        board.fen_count[key] -= 1
+        if board.fen_count[key] <= 0:
+            del board.fen_count[key]
+    board.fen = board.fen_history[-1]
+    board.pgn = board.pgn[:prev_pgn_len]
+    board.moves.pop()
+    board.next_turn = move[0]
+
+    board[to_sq] = 0
+    if move[0] == "G":
+        board.goat_points.remove(to_sq)
+        board.no_of_goat_moves -= 1
+        if from_sq is None:
+            board.goats_placed -= 1
+        else:
+            Goat(board, from_sq)
+    else:
+        board.bagh_points.remove(to_sq)
+        board.no_of_bagh_moves -= 1
+        Bagh(board, from_sq)
+
+    if captured_sq is not None:
+        Goat(board, captured_sq)
+        board.goats_captured -= 1
+
+    return prev_zobrist
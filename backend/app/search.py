@@ -0,0 +1,153 @@
+import pickle
+import time
+from typing import Dict, Optional, Tuple
+
+from baghchal.env import Board
+from baghchal.engine import Engine, INF
+
+from .moves import make_move, unmake_move
+from .zobrist import zobrist_hash
+
+# Transposition table entry flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Keep the table from growing without bound on a long-lived server. Every
+# EXECUTOR worker keeps its own copy across requests, and one search stores at
+# most a few thousand nodes, so this still covers many searches per worker.
+TT_MAX_ENTRIES = 1 << 16
+
+# Nodes searched between time-budget checks
+DEADLINE_CHECK_INTERVAL = 256
+
+# hash -> (depth, best_move, score, flag)
+TTEntry = Tuple[int, str, float, int]
+transposition_table: Dict[int, TTEntry] = {}
+
+def tt_probe(h: int, depth: int) -> Optional[TTEntry]:
+    """Return the cached entry for `h` if it was searched at least `depth` plies deep."""
+    entry = transposition_table.get(h)
+    if entry is not None and entry[0] >= depth and entry[3] == EXACT:
+        return entry
+    return None
+
+def tt_store(h: int, depth: int, best_move: str, score: float, flag: int = EXACT) -> None:
+    existing = transposition_table.get(h)
+    if existing is not None and existing[0] > depth:
+        # Never replace a deeper search with a shallower one
+        return
+    if existing is None and len(transposition_table) >= TT_MAX_ENTRIES:
+        transposition_table.clear()
+    transposition_table[h] = (depth, best_move, score, flag)
+
+def tt_best_move(h: int) -> Optional[str]:
+    """Best move recorded for `h` at any depth, used to order the next search."""
+    entry = transposition_table.get(h)
+    return entry[1] if entry is not None else None
+
+class SearchTimeout(Exception):
+    """Raised from inside the search once the time budget is spent."""
+
+class IterativeEngine(Engine):
+    """
+    Alpha-beta search over the upstream Engine's evaluation, for iterative deepening.
+
+    Every node tries the transposition table's best move for its position first,
+    so each iteration is ordered by the previous one, and moves are played with
+    make/unmake on one board instead of deep-copying it per child.
+    """
+
+    def __init__(self, depth=5, deadline: Optional[float] = None):
+        super().__init__(depth)
+        self.deadline = deadline
+        self.nodes = 0
+
+    def search(self, board: Board, h: int, depth: int, alpha: float, beta: float,
+               maximize: bool, hint: Optional[str] = None) -> Tuple[str, float]:
+        if depth == 0 or board.is_game_over():
+            return 0, self.static_evaluation(board)
+
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % DEADLINE_CHECK_INTERVAL == 0 \
+                and time.monotonic() >= self.deadline:
+            raise SearchTimeout
+
+        moves = list(board.possible_moves())
+        if not maximize:
+            moves.sort(key=lambda a: 5 - len(a))
+        first = tt_best_move(h) or hint
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = 0
+        best_eval = -INF if maximize else INF
+        for move in moves:
+            child_h, record = make_move(board, move, h)
+            try:
+                eval_ = self.search(board, child_h, depth - 1, alpha, beta, not maximize)[1]
+            finally:
+                unmake_move(board, record)
+            if maximize:
+                if eval_ > best_eval:
+                    best_eval, best_move = eval_, move
+                alpha = max(alpha, eval_)
+            else:
+                if eval_ < best_eval:
+                    best_eval, best_move = eval_, move
+                beta = min(beta, eval_)
+            if beta <= alpha:
+                break
+
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        tt_store(h, depth, best_move, best_eval, flag)
+        return best_move, best_eval
+
+    def get_best_move_depth(self, board: Board, depth: int, tt_hint: Optional[str] = None) -> Tuple[str, float]:
+        return self.search(board, zobrist_hash(board), depth, -INF, INF, board.next_turn == "G", hint=tt_hint)
+
+def best_move_iterative(engine: IterativeEngine, board: Board, max_depth: int,
+                        tt_hint: Optional[str] = None, budget: Optional[float] = None) -> Tuple[str, float, int]:
+    """
+    Iterative deepening from depth 1 to `max_depth`, each iteration ordered by the
+    best moves the previous one stored in the transposition table.
+
+    Once `budget` seconds have elapsed the running iteration is abandoned and the
+    deepest completed search is returned as (move, score, depth). Depth 1 always
+    completes so there is a move to play.
+    """
+    deadline = time.monotonic() + budget if budget is not None else None
+    h = zobrist_hash(board)
+    best_move, score, depth = 0, 0.0, 0
+
+    for d in range(1, max_depth + 1):
+        cached = tt_probe(h, d)
+        if cached is not None:
+            best_move, score = cached[1], cached[2]
+        else:
+            engine.deadline = deadline if d > 1 else None
+            try:
+                best_move, score = engine.get_best_move_depth(board, d, tt_hint=tt_hint)
+            except SearchTimeout:
+                break
+        depth = d
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+    return best_move, score, depth
+
+def bot_think(board_snapshot: bytes, depth: int, tt_hint: Optional[str] = None,
+              budget: Optional[float] = None) -> Tuple[str, float, int]:
+    """
+    Run an iterative-deepening search on a pickle.dumps(board) snapshot; meant to be
+    submitted to a process pool, with the snapshot taken before the board can change.
+    """
+    board = pickle.loads(board_snapshot)
+    return best_move_iterative(IterativeEngine(depth=depth), board, depth, tt_hint=tt_hint, budget=budget)
@@ -0,0 +1,60 @@
+import logging
+import threading
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class GameStore(TTLCache):
+    """
+    Bounded in-memory game store.
+
+    Games expire after `ttl` seconds without being accessed, and the least
+    recently used game is dropped once `maxsize` is reached. Access is
+    serialized with an RLock so check-and-set sequences stay consistent if
+    the store is touched from worker threads.
+    """
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            # Re-inserting refreshes the expiry, so only inactive games time out
+            super().__setitem__(key, value)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+
+    def get(self, key, default=None):
+        # One lookup, so a game that expires after an `in` check cannot raise KeyError
+        with self._lock:
+            try:
+                return self[key]
+            except KeyError:
+                return default
+
+    def __contains__(self, key):
+        with self._lock:
+            return super().__contains__(key)
+
+    def expire(self, time=None):
+        with self._lock:
+            expired = super().expire(time)
+        if expired:
+            logger.info(f"Expired {len(expired)} inactive game(s), {len(self)} remaining")
+        return expired
+
+    def popitem(self):
+        with self._lock:
+            key, value = super().popitem()
+        logger.info(f"Evicted game {key} (store full at {self.maxsize} games)")
+        return key, value
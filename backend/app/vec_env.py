@@ -0,0 +1,113 @@
+import gymnasium as gym
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode
+import numpy as np
+from baghchal.lookup_table import action_space
+
+from .env import BaghChalEnv, REV_ACTIONS
+
+N_ACTIONS = len(action_space)
+INVALID_MOVE_REWARD = -100
+
+class BaghChalVecEnv(gym.vector.VectorEnv):
+    """
+    Steps N Bagh Chal boards per call in a single process.
+
+    Observations are written into one preallocated (N, 5, 5, 5) buffer and the
+    invalid-action penalty is computed for the whole batch at once from the
+    stacked action masks. Finished sub-environments are reset in the same step;
+    their last observation and info are returned in info["final_obs"] and
+    info["final_info"].
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_envs, copy=True):
+        self.envs = [BaghChalEnv() for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.copy = copy
+
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+        self.observation_space = spaces.Box(low=0, high=20, shape=(num_envs, 5, 5, 5), dtype=np.float64)
+        self.action_space = spaces.MultiDiscrete(np.full(num_envs, N_ACTIONS))
+
+        self._obs = np.empty((num_envs, 5, 5, 5), dtype=np.float64)
+        self._masks = np.zeros((num_envs, N_ACTIONS), dtype=np.float64)
+        self._rewards = np.zeros(num_envs, dtype=np.float64)
+        self._terminations = np.zeros(num_envs, dtype=np.bool_)
+        self._truncations = np.zeros(num_envs, dtype=np.bool_)
+        self._env_idx = np.arange(num_envs)
+
+    def reset(self, seed=None, options=None):
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = seed
+
+        for i, (env, s) in enumerate(zip(self.envs, seeds)):
+            env.reset(seed=s)
+            self._obs[i] = env.board.board_repr()
+            self._masks[i] = env.board.possible_moves_vector()
+
+        return self._observations(), self._get_info()
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+
+        # Invalid actions terminate their episode with a heavy penalty, same as BaghChalEnv
+        invalid = self._masks[self._env_idx, actions] == 0
+        self._rewards[:] = np.where(invalid, INVALID_MOVE_REWARD, 0)
+        self._terminations[:] = invalid
+
+        for i in np.flatnonzero(~invalid):
+            reward, terminated = self.envs[i]._apply_move(REV_ACTIONS[actions[i]])
+            self._rewards[i] = reward
+            self._terminations[i] = terminated
+
+        info = {}
+        for i, env in enumerate(self.envs):
+            self._obs[i] = env.board.board_repr()
+            if self._terminations[i]:
+                final_info = {"turn": env.board.next_turn, "action_mask": env.board.possible_moves_vector()}
+                info = self._add_info(info, {"final_obs": self._obs[i].copy(), "final_info": final_info}, i)
+                env.reset()
+                self._obs[i] = env.board.board_repr()
+            self._masks[i] = env.board.possible_moves_vector()
+
+        info.update(self._get_info())
+
+        return (
+            self._observations(),
+            self._rewards.copy(),
+            self._terminations.copy(),
+            self._truncations.copy(),
+            info,
+        )
+
+    def _observations(self):
+        return self._obs.copy() if self.copy else self._obs
+
+    def _get_info(self):
+        return {
+            "turn": np.array([env.board.next_turn for env in self.envs], dtype=object),
+            "action_mask": self._masks.copy(),
+        }
+
+    def close_extras(self, **kwargs):
+        for env in self.envs:
+            env.close()
+
+def make_vec(n, vectorization_mode="sync"):
+    """
+    Create N batched Bagh Chal environments.
+
+    "sync" steps every board in-process with BaghChalVecEnv; "async" runs one
+    BaghChalEnv per worker process via gymnasium's AsyncVectorEnv. Both reset
+    finished boards in the same step.
+    """
+    if vectorization_mode == "async":
+        return gym.vector.AsyncVectorEnv([BaghChalEnv for _ in range(n)], autoreset_mode=AutoresetMode.SAME_STEP)
+    if vectorization_mode == "sync":
+        return BaghChalVecEnv(n)
+    raise ValueError(f"Unknown vectorization_mode: {vectorization_mode}")
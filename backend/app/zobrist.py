@@ -0,0 +1,25 @@
+import random
+
+from baghchal.env import Board
+
+# Zobrist keys, generated once at import (app startup).
+# One key per square per piece type (G, B), plus side-to-move and
+# the goat counters that are not visible from piece positions alone.
+_rng = random.Random(0xBA6C)
+PIECE_INDEX = {"G": 0, "B": 1}
+ZOBRIST_PIECES = [[_rng.getrandbits(64) for _ in PIECE_INDEX] for _ in range(25)]
+ZOBRIST_BAGH_TO_MOVE = _rng.getrandbits(64)
+ZOBRIST_GOATS_PLACED = [_rng.getrandbits(64) for _ in range(21)]
+ZOBRIST_GOATS_CAPTURED = [_rng.getrandbits(64) for _ in range(6)]
+
+def zobrist_hash(board: Board) -> int:
+    h = 0
+    for x, y in board.goat_points:
+        h ^= ZOBRIST_PIECES[(x - 1) * 5 + (y - 1)][0]
+    for x, y in board.bagh_points:
+        h ^= ZOBRIST_PIECES[(x - 1) * 5 + (y - 1)][1]
+    if board.next_turn == "B":
+        h ^= ZOBRIST_BAGH_TO_MOVE
+    h ^= ZOBRIST_GOATS_PLACED[board.goats_placed]
+    h ^= ZOBRIST_GOATS_CAPTURED[min(board.goats_captured, 5)]
+    return h
@@ -3,6 +3,18 @@ import glob
 import re
 import math
 import logging
+from multiprocessing import Pool
+from pathlib import Path
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -13,43 +25,70 @@ GAME_LOGS_DIR = "logs/game_logs"
 DEFAULT_ELO = 1200
 K_FACTOR = 32
 
+# Bytes read from the top of each PGN when looking for headers
+HEADER_READ_SIZE = 4096
+# Below this many files, worker start-up costs more than a serial parse saves
+PARALLEL_PARSE_MIN_FILES = 256
+
+# Matches the White/Black/Result headers in one scan; the side suffix
+# (" (Goat)" / " (Tiger)") is stripped from player names.
+_HEADER_RE = re.compile(rb'\[(White|Black|Result) "([^"]*?)(?: \((?:Goat|Tiger)\))?"\]')
+
 def sanitize_filename(name):
     return re.sub(r'[^a-zA-Z0-9]', '', name)
 
+@njit(cache=True)
 def get_expected_score(rating_a, rating_b):
     return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
 
-def update_ratings(rating_a, rating_b, score_a):
-    expected_a = get_expected_score(rating_a, rating_b)
-    new_rating_a = rating_a + K_FACTOR * (score_a - expected_a)
-    new_rating_b = rating_b + K_FACTOR * ((1 - score_a) - (1 - expected_a))
-    return new_rating_a, new_rating_b
+@njit(cache=True)
+def _update_all(white_idx, black_idx, scores, ratings, k):
+    """
+    Applies every game to `ratings` in place, in order.
+    """
+    for i in range(white_idx.shape[0]):
+        a = white_idx[i]
+        b = black_idx[i]
+        delta = k * (scores[i] - get_expected_score(ratings[a], ratings[b]))
+        ratings[a] += delta
+        ratings[b] -= delta
+
+def _scan_headers(content):
+    # Keep the first occurrence of each header (files may hold several games)
+    headers = {}
+    for match in _HEADER_RE.finditer(content):
+        headers.setdefault(match.group(1), match.group(2))
+        if len(headers) == 3:
+            break
+    return headers
 
 def parse_pgn(filepath):
     """
     Parses a PGN file to extract White, Black, and Result.
     """
-    white = None
-    black = None
-    result = None
-    
-    with open(filepath, 'r') as f:
-        content = f.read()
-        
-    # Extract headers using regex
-    white_match = re.search(r'[\[]White "(.*?)( \(Goat\))?"[\]]', content)
-    black_match = re.search(r'[\[]Black "(.*?)( \(Tiger\))?"[\]]', content)
-    result_match = re.search(r'[\[]Result "(.*?)"[\]]', content)
-    
-    if white_match:
-        white = white_match.group(1) # Group 1 is model name, Group 2 is " (Goat)"
-    if black_match:
-        black = black_match.group(1)
-    if result_match:
-        result = result_match.group(1)
+    with open(filepath, 'rb') as f:
+        # Headers sit at the top of the file, so the first block is normally enough
+        content = f.read(HEADER_READ_SIZE)
+        headers = _scan_headers(content)
+        if len(headers) < 3:
+            headers = _scan_headers(content + f.read())
+
+    white, black, result = (
+        headers[key].decode('utf-8') if key in headers else None
+        for key in (b'White', b'Black', b'Result')
+    )
         
     return white, black, result
 
+def parse_pgns(pgn_files):
+    """
+    Parses every PGN, in parallel for large corpora. Results keep the order of `pgn_files`.
+    """
+    if len(pgn_files) < PARALLEL_PARSE_MIN_FILES:
+        return [parse_pgn(filepath) for filepath in pgn_files]
+    with Pool() as pool:
+        return list(pool.imap(parse_pgn, pgn_files, chunksize=64))
+
 def result_to_score(result):
     if result == "1-0": return 1.0
     if result == "0-1": return 0.0
@@ -68,13 +107,15 @@ def calculate_elos():
     # String sort works for YYYY_MM_DD...
     pgn_files.sort()
     
-    ratings = {}
-    
     logger.info(f"Found {len(pgn_files)} game logs. Calculating ELOs...")
-    
-    for filepath in pgn_files:
-        white, black, result = parse_pgn(filepath)
-        
+
+    # Parsing is independent per file; the rating updates below stay in chronological order
+    parsed = parse_pgns(pgn_files)
+
+    # Intern model names to indices so the update loop works on flat arrays
+    model_index = {}
+    games = []
+    for filepath, (white, black, result) in zip(pgn_files, parsed):
         if not white or not black or not result:
             logger.warning(f"Skipping malformed PGN: {filepath}")
             continue
@@ -83,21 +124,18 @@ def calculate_elos():
         if score_white is None:
             logger.warning(f"Skipping game with unknown result '{result}': {filepath}")
             continue
-            
-        # Initialize ratings if new
-        if white not in ratings: ratings[white] = DEFAULT_ELO
-        if black not in ratings: ratings[black] = DEFAULT_ELO
-        
-        old_white = ratings[white]
-        old_black = ratings[black]
-        
-        # Update
-        new_white, new_black = update_ratings(old_white, old_black, score_white)
-        
-        ratings[white] = new_white
-        ratings[black] = new_black
-        
-        logger.debug(f"Game: {white} ({old_white:.1f}) vs {black} ({old_black:.1f}) | Result: {result} -> New: {new_white:.1f}, {new_black:.1f}")
+
+        white_i = model_index.setdefault(white, len(model_index))
+        black_i = model_index.setdefault(black, len(model_index))
+        games.append((white_i, black_i, score_white))
+
+    white_idx = np.fromiter((g[0] for g in games), dtype=np.int64, count=len(games))
+    black_idx = np.fromiter((g[1] for g in games), dtype=np.int64, count=len(games))
+    scores = np.fromiter((g[2] for g in games), dtype=np.float64, count=len(games))
+
+    elos = np.full(len(model_index), DEFAULT_ELO, dtype=np.float64)
+    _update_all(white_idx, black_idx, scores, elos, float(K_FACTOR))
+    ratings = dict(zip(model_index, elos.tolist()))
 
     # 3. Write to files
     logger.info("Updating ELO files in logs/elos/...")
@@ -105,20 +143,17 @@ def calculate_elos():
         sanitized = sanitize_filename(model)
         filepath = os.path.join(ELO_DIR, f"{sanitized}.txt")
         try:
-            with open(filepath, 'w') as f:
-                f.write(f"{rating:.2f}")
+            Path(filepath).write_text(f"{rating:.2f}")
             logger.info(f"Saved {model}: {rating:.2f} to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save ELO for {model}: {e}")
 
     # Also save a summary CSV
     summary_path = os.path.join(ELO_DIR, "summary.csv")
-    with open(summary_path, 'w') as f:
-        f.write("Model,ELO\n")
-        # Sort by rating descending
-        sorted_models = sorted(ratings.items(), key=lambda x: x[1], reverse=True)
-        for m, r in sorted_models:
-            f.write(f"{m},{r:.2f}\n")
+    # Sort by rating descending
+    sorted_models = sorted(ratings.items(), key=lambda x: x[1], reverse=True)
+    lines = [f"{m},{r:.2f}\n" for m, r in sorted_models]
+    Path(summary_path).write_text("Model,ELO\n" + "".join(lines))
     logger.info(f"Saved summary to {summary_path}")
 
 if __name__ == "__main__":
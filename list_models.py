@@ -1,6 +1,14 @@
 import os
 import sys
+from pathlib import Path
 import httpx
+import orjson
+
+MODELS_URL = "https://openrouter.ai/api/v1/models"
+# The model list is cached on disk and revalidated with its ETag
+CACHE_DIR = Path.home() / ".cache" / "openrouter"
+CACHE_PATH = CACHE_DIR / "models.json"
+ETAG_PATH = CACHE_DIR / "models.etag"
 
 def get_api_key():
     try:
@@ -11,22 +19,42 @@ def get_api_key():
         print("Error: .or file containing API key not found.")
         sys.exit(1)
 
-def list_models():
-    api_key = get_api_key()
-    url = "https://openrouter.ai/api/v1/models"
+def fetch_models(api_key):
+    """
+    Returns the OpenRouter model list, reusing the cached copy when the server answers 304.
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
         "HTTP-Referer": "https://github.com/gemini-cli/bagh-chal", # Optional but good practice
         "X-Title": "Bagh-Chal CLI"
     }
+    if CACHE_PATH.exists() and ETAG_PATH.exists():
+        headers["If-None-Match"] = ETAG_PATH.read_text().strip()
+
+    with httpx.Client() as client:
+        response = client.get(MODELS_URL, headers=headers)
+
+    if response.status_code == 304:
+        content = CACHE_PATH.read_bytes()
+    else:
+        response.raise_for_status()
+        content = response.content
+        etag = response.headers.get("etag")
+        if etag:
+            try:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                CACHE_PATH.write_bytes(content)
+                ETAG_PATH.write_text(etag)
+            except OSError as e:
+                print(f"Warning: could not cache model list: {e}", file=sys.stderr)
+
+    return orjson.loads(content).get("data", [])
+
+def list_models():
+    api_key = get_api_key()
     
     try:
-        with httpx.Client() as client:
-            response = client.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-        models = data.get("data", [])
+        models = fetch_models(api_key)
         
         # Sort models alphabetically by ID
         models.sort(key=lambda x: x["id"])
@@ -1,28 +1,15 @@
 import argparse
 import sys
-import httpx
-import pandas as pd
 import logging
-from list_models import get_api_key
+from list_models import get_api_key, fetch_models
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
 def get_all_models_pricing(api_key):
-    url = "https://openrouter.ai/api/v1/models"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "HTTP-Referer": "https://github.com/gemini-cli/bagh-chal",
-        "X-Title": "Bagh-Chal CLI"
-    }
-    
     try:
-        with httpx.Client() as client:
-            response = client.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", [])
+        return fetch_models(api_key)
     except Exception as e:
         logger.error(f"Failed to fetch models: {e}")
         sys.exit(1)
@@ -48,16 +35,18 @@ def show_prices(requested_models):
                 "Request ($)": float(pricing.get("request", 0))
             })
         else:
-            rows.append({
-                "Model": model_name,
-                "Prompt ($/1M)": "N/A",
-                "Completion ($/1M)": "N/A",
-                "Image ($)": "N/A",
-                "Request ($)": "N/A"
-            })
-            
-    df = pd.DataFrame(rows)
-    print(df.to_string(index=False))
+            logger.warning(f"Model not found on OpenRouter: {model_name}")
+
+    if not rows:
+        return
+
+    width = max(len("Model"), *(len(row["Model"]) for row in rows))
+    print(f"{'Model':<{width}} {'Prompt ($/1M)':>14} {'Completion ($/1M)':>18} {'Image ($)':>10} {'Request ($)':>12}")
+    for row in rows:
+        print(
+            f"{row['Model']:<{width}} {row['Prompt ($/1M)']:>14.4f} {row['Completion ($/1M)']:>18.4f} "
+            f"{row['Image ($)']:>10.4f} {row['Request ($)']:>12.4f}"
+        )
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Get pricing for OpenRouter models")
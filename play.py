@@ -1,11 +1,20 @@
 import argparse
+import asyncio
+import atexit
+import hashlib
+import sqlite3
 import sys
 import logging
 import os
 import time
+import weakref
 import re
 import datetime
-from openai import OpenAI, RateLimitError
+import functools
+from collections import defaultdict
+import importlib.util
+import httpx
+from openai import AsyncOpenAI, RateLimitError
 
 # Capture the original working directory before imports (baghchal changes CWD)
 ORIGINAL_CWD = os.getcwd()
@@ -17,7 +26,14 @@ from baghchal.lookup_table import reversed_action_space
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+# Set by the tournament so pool workers inherit the key instead of re-reading the file
+API_KEY_ENV = "OPENROUTER_API_KEY"
+
+@functools.lru_cache(maxsize=1)
 def get_api_key():
+    api_key = os.environ.get(API_KEY_ENV)
+    if api_key:
+        return api_key
     try:
         file_path = os.path.expanduser("~/.config/.or")
         with open(file_path, 'r') as f:
@@ -26,16 +42,176 @@ def get_api_key():
         logger.error(f"Error: .or file containing API key not found at {file_path}")
         sys.exit(1)
 
+# One pooled connection per in-flight request, kept alive across moves and matches.
+# HTTP/2 multiplexes them further when the optional h2 package is installed.
+HTTP_LIMITS = httpx.Limits(max_connections=128, max_keepalive_connections=128)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
 def create_client(api_key):
-    return OpenAI(
+    transport = httpx.AsyncHTTPTransport(
+        retries=2,  # connect failures only; API errors are retried in get_llm_move
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=HTTP_LIMITS,
+    )
+    return AsyncOpenAI(
         base_url="https://openrouter.ai/api/v1",
         api_key=api_key,
+        http_client=httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT),
     )
 
+# Per-model request budget. Calls go out as fast as the budget allows and only
+# block once it is spent, or after a 429 told us to back off.
+REQUESTS_PER_MINUTE = 60
+RATE_LIMIT_BACKOFF = 300 # seconds, when a 429 carries no Retry-After
+
+class RateLimiter:
+    """Token bucket refilled at `requests_per_minute / 60` requests per second."""
+
+    def __init__(self, requests_per_minute):
+        self.rate = requests_per_minute / 60
+        self.capacity = requests_per_minute
+        self.available = requests_per_minute
+        self.last_update = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.last_update) * self.rate)
+                self.last_update = now
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.available >= 1:
+                        self.available -= 1
+                        return
+                    wait = (1 - self.available) / self.rate
+                await asyncio.sleep(wait)
+
+    def back_off(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.available = 0
+
+# event loop -> model -> limiter. A limiter's asyncio.Lock binds to the loop it is
+# first contended in, and a tournament worker runs each match under a new asyncio.run
+_rate_limiters = weakref.WeakKeyDictionary()
+
+def get_rate_limiter(model):
+    limiters = _rate_limiters.setdefault(asyncio.get_running_loop(), {})
+    if model not in limiters:
+        limiters[model] = RateLimiter(REQUESTS_PER_MINUTE)
+    return limiters[model]
+
+def retry_after_seconds(error):
+    """Seconds to wait from a 429's Retry-After header, or RATE_LIMIT_BACKOFF if absent."""
+    try:
+        return float(error.response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return RATE_LIMIT_BACKOFF
+
+# Optional on-disk cache of moves already chosen by each model, so positions repeated
+# across games (mostly opening placements) skip the API call. Off unless --move-cache
+# sets MOVE_CACHE_PATH: a hit replays the model's earlier choice instead of sampling
+# a new move, so repeated games are no longer independent.
+# Positions are stored under the smallest of their 8 rotations/reflections; Bagh-Chal's
+# diagonals only join squares with an even row+col, which every symmetry preserves.
+MOVE_CACHE_FILE = ".move_cache.sqlite"
+MOVE_CACHE_PATH = None
+SYMMETRIES = (
+    lambda r, c: (r, c),
+    lambda r, c: (c, 6 - r),
+    lambda r, c: (6 - r, 6 - c),
+    lambda r, c: (6 - c, r),
+    lambda r, c: (r, 6 - c),
+    lambda r, c: (6 - r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (6 - c, 6 - r),
+)
+INVERSE_SYMMETRY = (0, 3, 2, 1, 4, 5, 6, 7)
+
+class MoveCache:
+    """Key -> move table in SQLite, which tournament worker processes can share safely."""
+
+    def __init__(self, path):
+        # Autocommit, so every stored move is durable even if a worker exits abruptly
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS moves (key TEXT PRIMARY KEY, move TEXT NOT NULL)")
+
+    def get(self, key):
+        row = self.conn.execute("SELECT move FROM moves WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def __setitem__(self, key, move):
+        self.conn.execute("INSERT OR REPLACE INTO moves (key, move) VALUES (?, ?)", (key, move))
+
+    def close(self):
+        self.conn.close()
+
+_move_cache = None
+
+def get_move_cache():
+    # Opened lazily, so a process that forks workers never shares its connection with them
+    global _move_cache
+    if MOVE_CACHE_PATH is None:
+        return None
+    if _move_cache is None:
+        _move_cache = MoveCache(MOVE_CACHE_PATH)
+        atexit.register(_move_cache.close)
+    return _move_cache
+
+def transform_move(move, sym):
+    """Apply symmetry `sym` to every square of a PGN move ("G11", "G1112", "Bx1133")."""
+    n_squares = 1 if len(move) == 3 else 2
+    out = move[:len(move) - 2 * n_squares]
+    for i in range(len(out), len(move), 2):
+        r, c = SYMMETRIES[sym](int(move[i]), int(move[i + 1]))
+        out += f"{r}{c}"
+    return out
+
+def move_cache_key(model, board):
+    """Cache key and symmetry index for the canonical orientation of `board`."""
+    placements = []
+    for sym, transform in enumerate(SYMMETRIES):
+        grid = [["."] * 5 for _ in range(5)]
+        for points, piece in ((board.goat_points, "G"), (board.bagh_points, "B")):
+            for r, c in points:
+                tr, tc = transform(r, c)
+                grid[tr - 1][tc - 1] = piece
+        placements.append(("".join(map("".join, grid)), sym))
+    canonical, sym = min(placements)
+
+    # Everything the prompt shows: placement, side to move and goats placed (captures follow from them)
+    key = f"{model}|{canonical}|{board.next_turn}|{board.goats_placed}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest(), sym
+
+# Stripped from LLM replies in one pass: html tags like <s>, bracketed tags like [OUT],
+# markdown emphasis/code marks, quotes and periods
+_CLEAN_RE = re.compile(r'<[^>]+>|\[[^\]]*\]|[*`\'".]')
+
 def sanitize_filename(name):
     return re.sub(r'[^a-zA-Z0-9]', '', name)
 
-def save_pgn(board, experiment_name, bestof, model1, model2, result, termination_reason):
+class PgnWriter:
+    """Buffers PGN records per file and appends each file's records in one write on flush_all."""
+
+    def __init__(self):
+        self.pending = defaultdict(list)
+
+    def add(self, filename, pgn_content):
+        self.pending[filename].append(pgn_content)
+
+    def flush_all(self):
+        for filename, blobs in self.pending.items():
+            try:
+                with open(filename, "a") as f:
+                    f.write("".join(blobs))
+            except Exception as e:
+                logger.error(f"Failed to save PGN: {e}")
+        self.pending.clear()
+
+def save_pgn(board, experiment_name, bestof, model1, model2, result, termination_reason, writer=None):
     timestamp = datetime.datetime.now().strftime("%Y_%m_%d")
     sanitized_m1 = sanitize_filename(model1)
     sanitized_m2 = sanitize_filename(model2)
@@ -55,25 +231,44 @@ def save_pgn(board, experiment_name, bestof, model1, model2, result, termination
 
 {board.pgn}
 """
+    if writer is not None:
+        writer.add(filename, pgn_content + "\n\n")
+        return
+
     try:
         with open(filename, "a") as f:
             f.write(pgn_content + "\n\n")
     except Exception as e:
         logger.error(f"Failed to save PGN: {e}")
 
-def get_valid_moves_str(board):
-    moves = board.possible_moves()
-    return ", ".join(sorted(list(moves)))
+# fen -> (legal moves, sorted prompt string). Openings repeat across games, and the
+# fen (placement, side to move, goat move count) fixes the legal moves of a live game.
+VALID_MOVES_CACHE_MAX = 1 << 16
+_valid_moves_by_fen = {}
+
+def get_valid_moves(board):
+    cached = _valid_moves_by_fen.get(board.fen)
+    if cached is None:
+        moves = board.possible_moves() or set() # 0 once the game is over
+        cached = (frozenset(moves), ", ".join(sorted(moves)))
+        if len(_valid_moves_by_fen) >= VALID_MOVES_CACHE_MAX:
+            _valid_moves_by_fen.clear()
+        _valid_moves_by_fen[board.fen] = cached
+    return cached
+
+# Rendered empty board; square (r, c) is the byte at (r-1)*10 + (c-1)*2
+_EMPTY_BOARD = b"\n".join([b". . . . ."] * 5)
+_GOAT, _BAGH = ord('G'), ord('B')
 
 def format_board_for_llm(board):
-    grid = [['.' for _ in range(5)] for _ in range(5)]
-    for r in range(1, 6):
-        for c in range(1, 6):
-            piece = board[r, c]
-            if piece:
-                grid[r-1][c-1] = str(piece) # 'B' or 'G'
+    # Copy the template and overwrite only the occupied squares
+    grid = bytearray(_EMPTY_BOARD)
+    for r, c in board.goat_points:
+        grid[(r-1)*10 + (c-1)*2] = _GOAT
+    for r, c in board.bagh_points:
+        grid[(r-1)*10 + (c-1)*2] = _BAGH
 
-    board_str = "\n".join([" ".join(row) for row in grid])
+    board_str = grid.decode('ascii')
 
     info = (
         f"Board State (5x5 Grid):\n{board_str}\n\n"
@@ -84,20 +279,43 @@ def format_board_for_llm(board):
     )
     return info
 
-def get_llm_move(client, model, board, retries=3):
-    valid_moves = get_valid_moves_str(board)
-    board_info = format_board_for_llm(board)
+SYSTEM_PROMPT = (
+    "You are playing the board game Bagh-Chal (Tiger and Goat).\n"
+    "You are an expert player.\n"
+    "Goat (G) wins by trapping all 4 Tigers.\n"
+    "Tiger (B) wins by capturing 5 Goats.\n"
+    "Output ONLY the move string from the list of valid moves. Do not add explanation."
+)
+
+RULES_PROMPT = (
+    "The board is a 5x5 grid. Coordinates are RowColumn (e.g., 11 is top-left, 55 is bottom-right).\n"
+    "Moves are in PGN format (e.g., 'G11' to place goat at 1,1; 'B1112' to move tiger from 1,1 to 1,2)."
+)
+
+# Shared by every request; never mutate these (retries append to the messages list instead)
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+_RULES_MSG = {"role": "user", "content": RULES_PROMPT}
+
+def get_cached_move(model, board):
+    """The move `model` chose earlier in this position, if the move cache is on and it is still legal."""
+    move_cache = get_move_cache()
+    if move_cache is None:
+        return None
+    cache_key, sym = move_cache_key(model, board)
+    cached = move_cache.get(cache_key)
+    if cached is None:
+        return None
+    move = transform_move(cached, INVERSE_SYMMETRY[sym])
+    return move if move in get_valid_moves(board)[0] else None
+
+async def get_llm_move(client, model, board, retries=3):
+    # Legal moves are computed once and shared by the prompt and retries
+    possible, valid_moves = get_valid_moves(board)
 
-    system_prompt = (
-        "You are playing the board game Bagh-Chal (Tiger and Goat).\n"
-        "You are an expert player.\n"
-        "The board is a 5x5 grid. Coordinates are RowColumn (e.g., 11 is top-left, 55 is bottom-right).\n"
-        "Goat (G) wins by trapping all 4 Tigers.\n"
-        "Tiger (B) wins by capturing 5 Goats.\n"
-        "Moves are in PGN format (e.g., 'G11' to place goat at 1,1; 'B1112' to move tiger from 1,1 to 1,2).\n"
-        "Output ONLY the move string from the list of valid moves. Do not add explanation."
-    )
+    board_info = format_board_for_llm(board)
 
+    # Static messages first and the position last, so the prompt prefix is
+    # byte-identical across moves, games and retries for provider prompt caching
     user_prompt = (
         f"{board_info}\n"
         f"Valid Moves: [{valid_moves}]\n"
@@ -106,13 +324,16 @@ def get_llm_move(client, model, board, retries=3):
     )
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        _SYSTEM_MSG,
+        _RULES_MSG,
         {"role": "user", "content": user_prompt}
     ]
 
+    limiter = get_rate_limiter(model)
     for attempt in range(retries):
         try:
-            response = client.chat.completions.create(
+            await limiter.acquire()
+            response = await client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=0.2,
@@ -120,18 +341,14 @@ def get_llm_move(client, model, board, retries=3):
 
             content = response.choices[0].message.content.strip()
             # Clean up content more aggressively
-            import re
-            cleaned = re.sub(r'<[^>]+>', '', content) # remove html tags like <s>
-            cleaned = re.sub(r'\[.*?\]', '', cleaned) # remove [OUT] etc
-            cleaned = cleaned.replace('*', '').replace('`', '').strip()
-
-            if cleaned:
-                move = cleaned.split()[0].replace("'", "").replace('"', "").replace(".", "")
-            else:
-                move = ""
+            cleaned = _CLEAN_RE.sub('', content).strip()
+            move = cleaned.split()[0] if cleaned else ""
 
-            possible = board.possible_moves()
             if move in possible:
+                move_cache = get_move_cache()
+                if move_cache is not None:
+                    cache_key, sym = move_cache_key(model, board)
+                    move_cache[cache_key] = transform_move(move, sym)
                 return move
 
             logger.info(f"Illegal move attempt {attempt+1}/{retries} by {model}: '{content}' (Parsed: '{move}'). Re-prompting with feedback...")
@@ -143,8 +360,10 @@ def get_llm_move(client, model, board, retries=3):
         except RateLimitError as e:
             logger.error(f"Rate limit error for {model}: {e}")
             if attempt < retries - 1:
-                logger.info("Sleeping for 5 minutes before retrying...")
-                time.sleep(300)
+                # Pauses every game using this model, not just this one
+                delay = retry_after_seconds(e)
+                logger.info(f"Backing off {model} for {delay:.0f}s before retrying...")
+                limiter.back_off(delay)
             else:
                 logger.error("Max retries reached for rate limit.")
 
@@ -154,10 +373,14 @@ def get_llm_move(client, model, board, retries=3):
 
     return None
 
-def play_single_game(model_goat, model_tiger, client=None):
+async def play_single_game(model_goat, model_tiger, client=None):
     if client is None:
-        client = create_client(get_api_key())
+        # A client made here is closed here, so its connection pool does not outlive the game
+        async with create_client(get_api_key()) as client:
+            return await _play_single_game(model_goat, model_tiger, client)
+    return await _play_single_game(model_goat, model_tiger, client)
 
+async def _play_single_game(model_goat, model_tiger, client):
     board = Board()
     players = {'G': model_goat, 'B': model_tiger}
     # Store durations in seconds
@@ -171,16 +394,20 @@ def play_single_game(model_goat, model_tiger, client=None):
     termination_reason = "Normal"
 
     while not board.is_game_over() and move_count < max_moves:
-        time.sleep(2) # Rate limit friendly delay
-
         current_turn = board.next_turn
         current_model = players[current_turn]
 
-        start_time = time.time()
-        move = get_llm_move(client, current_model, board)
-        end_time = time.time()
-        duration = end_time - start_time
-        move_durations[current_model].append(duration)
+        move = get_cached_move(current_model, board)
+        if move:
+            timing = "cached"
+        else:
+            start_time = time.time()
+            move = await get_llm_move(client, current_model, board)
+            end_time = time.time()
+            duration = end_time - start_time
+            # Only real API calls count towards the per-move timing stats
+            move_durations[current_model].append(duration)
+            timing = f"{duration:.2f}s"
 
         if not move:
             logger.info(f"Game aborted. {current_model} ({current_turn}) failed to generate a valid move.")
@@ -190,7 +417,7 @@ def play_single_game(model_goat, model_tiger, client=None):
             board.pgn += f" {{Forfeit: {current_model} made illegal move}}"
             break
 
-        logger.info(f"Turn {move_count+1}: {current_turn} ({current_model}) plays {move} ({duration:.2f}s)")
+        logger.info(f"Turn {move_count+1}: {current_turn} ({current_model}) plays {move} ({timing})")
 
         try:
             board.move(move)
@@ -208,8 +435,8 @@ def play_single_game(model_goat, model_tiger, client=None):
 
     return winner_code, move_count, board, termination_reason, move_durations
 
-def play_game(model1, model2):
-    winner_code, move_count, board, reason, durations = play_single_game(model1, model2)
+async def play_game(model1, model2):
+    winner_code, move_count, board, reason, durations = await play_single_game(model1, model2)
 
     if winner_code == 'G':
         winner = f"Goat ({model1})"
@@ -230,10 +457,13 @@ if __name__ == "__main__":
     parser.add_argument("model1", help="Model name for Player 1 (Goat)")
     parser.add_argument("model2", help="Model name for Player 2 (Tiger)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--move-cache", action="store_true", help=f"Reuse moves each model already chose in the same position (stored in {MOVE_CACHE_FILE})")
 
     args = parser.parse_args()
 
     if args.debug:
         logger.setLevel(logging.DEBUG)
+    if args.move_cache:
+        MOVE_CACHE_PATH = os.path.join(ORIGINAL_CWD, MOVE_CACHE_FILE)
 
-    play_game(args.model1, args.model2)
\ No newline at end of file
+    asyncio.run(play_game(args.model1, args.model2))
\ No newline at end of file
@@ -1,22 +1,51 @@
 import argparse
+import asyncio
 import sys
 import logging
 import os
-import json
+import orjson
 import datetime
 
 # Capture CWD before imports might change it (baghchal changes CWD on import)
 ORIGINAL_CWD = os.getcwd()
 
-from play import play_single_game, create_client, get_api_key, save_pgn, sanitize_filename
+import play
+from play import play_single_game, create_client, get_api_key, save_pgn, PgnWriter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_match_logic(model_a, model_b, experiment_name, bestof, client=None):
+def match_results_path(experiment_name):
+    return os.path.join(ORIGINAL_CWD, f"logs/match_results/{experiment_name}.jsonl")
+
+def save_match_result(experiment_name, model_a, model_b, score_a, durations):
+    """Append one match result as a JSON line to the experiment's results file."""
+    filename = match_results_path(experiment_name)
+    result_data = {
+        "model_a": model_a,
+        "model_b": model_b,
+        "score_a": score_a,
+        "durations": durations
+    }
+    # Unbuffered, so each line goes out in a single O_APPEND write and matches
+    # run side by side (e.g. from --generate-commands) never interleave
+    with open(filename, "ab", buffering=0) as f:
+        f.write(orjson.dumps(result_data, option=orjson.OPT_APPEND_NEWLINE))
+    return filename
+
+async def run_match_logic(model_a, model_b, experiment_name, bestof, client=None, pgn_writer=None):
     if client is None:
-        client = create_client(get_api_key())
+        # A client made here is closed here, so its connection pool does not outlive the match
+        async with create_client(get_api_key()) as client:
+            return await _run_match_logic(model_a, model_b, experiment_name, bestof, client, pgn_writer)
+    return await _run_match_logic(model_a, model_b, experiment_name, bestof, client, pgn_writer)
+
+async def _run_match_logic(model_a, model_b, experiment_name, bestof, client, pgn_writer):
+    # Without a caller-owned writer (e.g. the tournament's), flush this match's games when it ends
+    owns_writer = pgn_writer is None
+    if owns_writer:
+        pgn_writer = PgnWriter()
 
     wins_a = 0
     wins_b = 0
@@ -33,60 +62,23 @@ def run_match_logic(model_a, model_b, experiment_name, bestof, client=None):
             else:
                 durations[m] = times # Should not happen if models consistent
 
-    # Game 1: A is Goat
-    logger.info(f"Match: {model_a} vs {model_b} | Game 1 (A=Goat)")
-    winner, _, board, reason, game_durations = play_single_game(model_a, model_b, client)
-    update_durations(game_durations)
-    
-    res_str = "*"
-    if winner == 'G': 
-        wins_a += 1
-        res_str = "1-0"
-    elif winner == 'B': 
-        wins_b += 1
-        res_str = "0-1"
-    else: 
-        draws += 1
-        res_str = "1/2-1/2"
-        
-    save_pgn(board, experiment_name, bestof, model_a, model_b, res_str, reason)
-    
-    if wins_a < games_needed and wins_b < games_needed:
-        # Game 2: B is Goat (Swap sides)
-        logger.info(f"Match: {model_a} vs {model_b} | Game 2 (B=Goat)")
-        winner, _, board, reason, game_durations = play_single_game(model_b, model_a, client)
-        update_durations(game_durations)
-        
-        # model_b is White (Goat). Result "1-0" means B wins.
-        res_str = "*"
-        if winner == 'G': 
-            wins_b += 1
-            res_str = "1-0"
-        elif winner == 'B': 
-            wins_a += 1
-            res_str = "0-1"
-        else: 
-            draws += 1
-            res_str = "1/2-1/2"
-            
-        save_pgn(board, experiment_name, bestof, model_b, model_a, res_str, reason)
+    def sides(game_idx):
+        # Alternate starter: A is Goat in odd games, B in even games
+        return (model_a, model_b) if game_idx % 2 != 0 else (model_b, model_a)
 
-    # Further games
-    game_idx = 3
-    while (wins_a < games_needed and wins_b < games_needed) and game_idx <= bestof:
-        # Alternate starter
-        if game_idx % 2 != 0:
-            p1, p2 = model_a, model_b
-            logger.info(f"Match: {model_a} vs {model_b} | Game {game_idx} (A=Goat)")
-        else:
-            p1, p2 = model_b, model_a
-            logger.info(f"Match: {model_a} vs {model_b} | Game {game_idx} (B=Goat)")
-            
-        winner, _, board, reason, game_durations = play_single_game(p1, p2, client)
+    async def play(game_idx):
+        p1, p2 = sides(game_idx)
+        logger.info(f"Match: {model_a} vs {model_b} | Game {game_idx} ({'A' if p1 == model_a else 'B'}=Goat)")
+        winner, _, board, reason, game_durations = await play_single_game(p1, p2, client)
+        return p1, p2, winner, board, reason, game_durations
+
+    def record(result):
+        nonlocal wins_a, wins_b, draws
+        p1, p2, winner, board, reason, game_durations = result
         update_durations(game_durations)
         
+        # p1 is White (Goat). Result "1-0" means p1 wins.
         res_str = "*"
-        
         if winner == 'G': # P1 wins
             res_str = "1-0"
             if p1 == model_a: wins_a += 1
@@ -99,8 +91,27 @@ def run_match_logic(model_a, model_b, experiment_name, bestof, client=None):
             draws += 1
             res_str = "1/2-1/2"
             
-        save_pgn(board, experiment_name, bestof, p1, p2, res_str, reason)
-        game_idx += 1
+        save_pgn(board, experiment_name, bestof, p1, p2, res_str, reason, writer=pgn_writer)
+
+    # Every game is started up front and results are taken in completion order.
+    # Once one side clinches, the games still in flight can no longer change the
+    # outcome, so they are cancelled rather than left to spend API calls.
+    tasks = [asyncio.create_task(play(i)) for i in range(1, bestof + 1)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            record(await next_done)
+            if wins_a >= games_needed or wins_b >= games_needed:
+                unfinished = sum(not task.done() for task in tasks)
+                if unfinished:
+                    logger.info(f"Match: {model_a} vs {model_b} decided, cancelling {unfinished} unfinished game(s)")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Games that already finished are kept even if another one raised
+        if owns_writer:
+            pgn_writer.flush_all()
 
     logger.info(f"Match Result: {model_a}: {wins_a}, {model_b}: {wins_b}, Draws: {draws}")
     
@@ -116,24 +127,14 @@ if __name__ == "__main__":
     parser.add_argument("bestof", type=int, help="Best of X games")
     parser.add_argument("model_a", help="Model A name")
     parser.add_argument("model_b", help="Model B name")
+    parser.add_argument("--move-cache", action="store_true", help=f"Reuse moves each model already chose in the same position (stored in {play.MOVE_CACHE_FILE})")
     
     args = parser.parse_args()
     
-    score_a, durations = run_match_logic(args.model_a, args.model_b, args.experiment_name, args.bestof)
+    if args.move_cache:
+        play.MOVE_CACHE_PATH = os.path.join(ORIGINAL_CWD, play.MOVE_CACHE_FILE)
     
-    # Save result to JSON
-    sanitized_m1 = sanitize_filename(args.model_a)
-    sanitized_m2 = sanitize_filename(args.model_b)
-    filename = os.path.join(ORIGINAL_CWD, f"logs/match_results/{args.experiment_name}_{sanitized_m1}_vs_{sanitized_m2}.json")
+    score_a, durations = asyncio.run(run_match_logic(args.model_a, args.model_b, args.experiment_name, args.bestof))
     
-    result_data = {
-        "model_a": args.model_a,
-        "model_b": args.model_b,
-        "score_a": score_a,
-        "durations": durations
-    }
-    
-    with open(filename, "w") as f:
-        json.dump(result_data, f)
-        
+    filename = save_match_result(args.experiment_name, args.model_a, args.model_b, score_a, durations)
     logger.info(f"Match result saved to {filename}")
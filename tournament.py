@@ -1,16 +1,22 @@
 import argparse
+import asyncio
 import sys
 import logging
+import logging.handlers
+import multiprocessing
 import os
 import datetime
+import functools
 import re
-import glob
-import json
+import orjson
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg') # plots are only saved to disk, never shown
 import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
 from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
 
 # Capture CWD before imports might change it
 ORIGINAL_CWD = os.getcwd()
@@ -24,8 +30,10 @@ ORIGINAL_CWD = os.getcwd()
 # Let's import `run_match_logic` from `run_match` module.
 # To do that, `run_match.py` needs to be importable.
 # It is in the same directory.
-from run_match import run_match_logic
-from play import create_client, get_api_key, sanitize_filename
+import run_match
+from run_match import run_match_logic, match_results_path, save_match_result
+import play
+from play import get_api_key, PgnWriter, API_KEY_ENV
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -53,6 +61,31 @@ def setup_logging(experiment_name, bestof):
     
     logger.info(f"Logging tournament to {log_filename}")
 
+def log_timing_stats(models, all_durations):
+    logger.info("\nTiming Statistics (Seconds per move):")
+    for model in models:
+        times = all_durations[model]
+        if times:
+            # Convert once; mean/std/median all run over the same float64 array
+            arr = np.fromiter(times, dtype=np.float64, count=len(times))
+            logger.info(f"{model}: Mean={arr.mean():.2f}s, Median={np.median(arr):.2f}s, StdDev={arr.std():.2f}s (N={len(arr)})")
+        else:
+            logger.info(f"{model}: No moves played (or data missing).")
+
+def save_heatmap(scores_df, experiment_name, bestof):
+    try:
+        fig = plt.figure(figsize=(10, 8))
+        # Rasterize the cell mesh so large model lists don't emit one vector patch per cell
+        sns.heatmap(scores_df, annot=True, cmap='coolwarm', vmin=0, vmax=1, rasterized=True)
+        plt.title(f'Tournament: {experiment_name} (BestOf{bestof})')
+        plt.tight_layout()
+        plot_filename = os.path.join(ORIGINAL_CWD, f"logs/tournament_logs/{datetime.datetime.now().strftime('%Y_%m_%d')}_{experiment_name}_results.png")
+        plt.savefig(plot_filename, dpi=100)
+        plt.close(fig)
+        logger.info(f"Saved results plot to {plot_filename}")
+    except Exception as e:
+        logger.error(f"Failed to save plot: {e}")
+
 def generate_commands(experiment_name, bestof, models, output_file):
     # Ensure output file is in ORIGINAL_CWD if it's a relative path
     if not os.path.isabs(output_file):
@@ -68,125 +101,143 @@ def analyze_results(experiment_name, bestof, models):
     setup_logging(experiment_name, bestof)
     logger.info(f"Analyzing results for experiment: {experiment_name}")
     
-    scores = pd.DataFrame(0.0, index=models, columns=models)
+    # Filled as a plain array; only wrapped in a DataFrame for printing and the heatmap
+    idx = {m: i for i, m in enumerate(models)}
+    scores = np.zeros((len(models), len(models)), dtype=np.float64)
     all_durations = {m: [] for m in models}
     
-    # Read all JSON files matching experiment name
-    # Pattern: logs/match_results/{experiment_name}_*.json
-    # Note: filenames might have sanitized model names.
-    # It's safer to read ALL jsons and filter by checking content if we can,
-    # or trust the filename start.
-    pattern = os.path.join(ORIGINAL_CWD, "logs/match_results", f"{experiment_name}_*.json")
-    files = glob.glob(pattern)
-    
-    logger.info(f"Found {len(files)} result files.")
-    
-    for filepath in files:
-        try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-                
-            model_a = data.get("model_a")
-            model_b = data.get("model_b")
-            score_a = data.get("score_a")
-            durations = data.get("durations", {})
-            
-            # Check if these models are in our current list (tournament subset)
-            if model_a in models and model_b in models:
-                scores.loc[model_a, model_b] = score_a
-                scores.loc[model_b, model_a] = 1.0 - score_a if score_a != 0.5 else 0.5
-                
-                for m, times in durations.items():
-                    if m in all_durations:
-                        all_durations[m].extend(times)
-        except Exception as e:
-            logger.error(f"Error reading {filepath}: {e}")
+    # One JSON line per played match. A pairing that was re-run appends another
+    # line, and the latest one wins, as when each match had its own file.
+    results_path = match_results_path(experiment_name)
+    latest = {}
+    try:
+        with open(results_path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    logger.error(f"Error reading {results_path} line {line_no}: {e}")
+                    continue
+                latest[(data.get("model_a"), data.get("model_b"))] = data
+    except FileNotFoundError:
+        logger.error(f"No results file at {results_path}")
+
+    logger.info(f"Found {len(latest)} match results.")
+
+    for (model_a, model_b), data in latest.items():
+        score_a = data.get("score_a")
+        durations = data.get("durations", {})
+
+        # Check if these models are in our current list (tournament subset)
+        if model_a in idx and model_b in idx:
+            scores[idx[model_a], idx[model_b]] = score_a
+            scores[idx[model_b], idx[model_a]] = 1.0 - score_a
+
+            for m, times in durations.items():
+                if m in all_durations:
+                    all_durations[m].extend(times)
 
     logger.info("\nTournament Results (Score Matrix):")
-    logger.info("\n" + str(scores))
+    scores_df = pd.DataFrame(scores, index=models, columns=models)
+    logger.info("\n" + str(scores_df))
     
-    logger.info("\nTiming Statistics (Seconds per move):")
-    for model in models:
-        times = all_durations[model]
-        if times:
-            mean_t = np.mean(times)
-            median_t = np.median(times)
-            std_t = np.std(times)
-            logger.info(f"{model}: Mean={mean_t:.2f}s, Median={median_t:.2f}s, StdDev={std_t:.2f}s (N={len(times)})")
-        else:
-            logger.info(f"{model}: No moves played (or data missing).")
+    log_timing_stats(models, all_durations)
             
     # Save confusion matrix
-    try:
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(scores, annot=True, cmap='coolwarm', vmin=0, vmax=1)
-        plt.title(f'Tournament: {experiment_name} (BestOf{bestof})')
-        plt.tight_layout()
-        plot_filename = os.path.join(ORIGINAL_CWD, f"logs/tournament_logs/{datetime.datetime.now().strftime('%Y_%m_%d')}_{experiment_name}_results.png")
-        plt.savefig(plot_filename)
-        logger.info(f"Saved results plot to {plot_filename}")
-    except Exception as e:
-        logger.error(f"Failed to save plot: {e}")
+    save_heatmap(scores_df, experiment_name, bestof)
+
+def init_worker(workers, log_queue, original_cwd, move_cache_path):
+    # Under spawn/forkserver the worker imports play after baghchal has changed the
+    # cwd, so paths derived from its ORIGINAL_CWD would point into the baghchal package
+    play.ORIGINAL_CWD = run_match.ORIGINAL_CWD = original_cwd
+    play.MOVE_CACHE_PATH = move_cache_path
+
+    # Workers only push records onto the queue; the parent's listener writes them
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
 
-def run_serial_tournament(experiment_name, bestof, models):
+    # Each worker has its own per-model rate limiters; split the budget between them
+    play.REQUESTS_PER_MINUTE = max(1, play.REQUESTS_PER_MINUTE // workers)
+
+def play_match_in_worker(model_a, model_b, experiment_name, bestof):
+    """
+    Play one match in a pool worker with its own event loop. run_match_logic
+    creates the client and closes it before the loop ends.
+
+    PGN records are returned rather than written so the parent can flush them
+    together with the rest of the tournament.
+    """
+    logger.info(f"--- Starting Match: {model_a} vs {model_b} ---")
+    pgn_writer = PgnWriter()
+    score_a, durations = asyncio.run(run_match_logic(model_a, model_b, experiment_name, bestof, pgn_writer=pgn_writer))
+    return score_a, durations, dict(pgn_writer.pending)
+
+async def run_serial_tournament(experiment_name, bestof, models, max_concurrency=4, move_cache=False):
     setup_logging(experiment_name, bestof)
-    client = create_client(get_api_key())
     
-    scores = pd.DataFrame(0.0, index=models, columns=models)
+    # Filled as a plain array; only wrapped in a DataFrame for printing and the heatmap
+    idx = {m: i for i, m in enumerate(models)}
+    scores = np.zeros((len(models), len(models)), dtype=np.float64)
     all_durations = {m: [] for m in models}
-    
-    for model_a, model_b in combinations(models, 2):
-        logger.info(f"--- Starting Match: {model_a} vs {model_b} ---")
-        
-        # We reuse logic from run_match.py but we need it to return score and durations
-        # run_match_logic(model_a, model_b, experiment_name, bestof, client) -> (score_a, durations)
-        score_a, durations = run_match_logic(model_a, model_b, experiment_name, bestof, client)
-        
-        scores.loc[model_a, model_b] = score_a
-        scores.loc[model_b, model_a] = 1.0 - score_a if score_a != 0.5 else 0.5
-        
-        for m, times in durations.items():
-            all_durations[m].extend(times)
+
+    # Each match runs in its own process (games within it still run concurrently),
+    # so board handling and prompt formatting are not serialized on one GIL.
+    # The pool size bounds how many matches are in flight.
+    os.environ[API_KEY_ENV] = get_api_key()
+    move_cache_path = os.path.join(ORIGINAL_CWD, play.MOVE_CACHE_FILE) if move_cache else None
+    loop = asyncio.get_running_loop()
+    log_queue = multiprocessing.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    listener.start()
+    executor = ProcessPoolExecutor(max_workers=max_concurrency, initializer=init_worker, initargs=(max_concurrency, log_queue, ORIGINAL_CWD, move_cache_path))
+    # Game records are kept in memory and written out once all matches are done
+    pgn_writer = PgnWriter()
+
+    async def play_match(model_a, model_b):
+        try:
+            score_a, durations, pgns = await loop.run_in_executor(
+                executor, play_match_in_worker, model_a, model_b, experiment_name, bestof
+            )
+        except Exception as e:
+            # One failed pairing should not throw away the matches still being played
+            logger.error(f"Match {model_a} vs {model_b} failed, skipping it: {e}")
+            return None
+        for filename, blobs in pgns.items():
+            pgn_writer.add(filename, "".join(blobs))
             
-        # Also save the result JSON for consistency?
-        sanitized_m1 = sanitize_filename(model_a)
-        sanitized_m2 = sanitize_filename(model_b)
-        filename = os.path.join(ORIGINAL_CWD, f"logs/match_results/{experiment_name}_{sanitized_m1}_vs_{sanitized_m2}.json")
+        # Also save the result so the tournament can be re-analyzed later
         try:
-            with open(filename, "w") as f:
-                json.dump({
-                    "model_a": model_a,
-                    "model_b": model_b,
-                    "score_a": score_a,
-                    "durations": durations
-                }, f)
+            save_match_result(experiment_name, model_a, model_b, score_a, durations)
         except Exception as e:
             logger.error(f"Failed to save JSON result: {e}")
+
+        return model_a, model_b, score_a, durations
+
+    try:
+        results = await asyncio.gather(*(play_match(a, b) for a, b in combinations(models, 2)))
+    finally:
+        # Off the loop thread, so matches that already finished can still record their results
+        await loop.run_in_executor(None, functools.partial(executor.shutdown, cancel_futures=True))
+        listener.stop()
+        pgn_writer.flush_all()
+
+    for model_a, model_b, score_a, durations in filter(None, results):
+        scores[idx[model_a], idx[model_b]] = score_a
+        scores[idx[model_b], idx[model_a]] = 1.0 - score_a
+        
+        for m, times in durations.items():
+            all_durations[m].extend(times)
     
     logger.info("\nTournament Results (Score Matrix):")
-    logger.info("\n" + str(scores))
+    scores_df = pd.DataFrame(scores, index=models, columns=models)
+    logger.info("\n" + str(scores_df))
     
-    logger.info("\nTiming Statistics (Seconds per move):")
-    for model in models:
-        times = all_durations[model]
-        if times:
-            mean_t = np.mean(times)
-            median_t = np.median(times)
-            std_t = np.std(times)
-            logger.info(f"{model}: Mean={mean_t:.2f}s, Median={median_t:.2f}s, StdDev={std_t:.2f}s (N={len(times)})")
-        else:
-            logger.info(f"{model}: No moves played.")
+    log_timing_stats(models, all_durations)
 
-    try:
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(scores, annot=True, cmap='coolwarm', vmin=0, vmax=1)
-        plt.title(f'Tournament: {experiment_name} (BestOf{bestof})')
-        plt.tight_layout()
-        plot_filename = os.path.join(ORIGINAL_CWD, f"logs/tournament_logs/{datetime.datetime.now().strftime('%Y_%m_%d')}_{experiment_name}_results.png")
-        plt.savefig(plot_filename)
-        logger.info(f"Saved results plot to {plot_filename}")
-    except Exception as e:
-        logger.error(f"Failed to save plot: {e}")
+    save_heatmap(scores_df, experiment_name, bestof)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run a Bagh-Chal LLM Tournament")
@@ -196,6 +247,8 @@ if __name__ == "__main__":
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("--generate-commands", metavar="FILE", help="Generate command list to FILE instead of running")
     parser.add_argument("--analyze", action="store_true", help="Analyze existing results in logs/match_results instead of running")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of matches played at the same time")
+    parser.add_argument("--move-cache", action="store_true", help=f"Reuse moves each model already chose in the same position (stored in {play.MOVE_CACHE_FILE})")
     
     args = parser.parse_args()
     
@@ -204,4 +257,4 @@ if __name__ == "__main__":
     elif args.analyze:
         analyze_results(args.experiment_name, args.bestof, args.models)
     else:
-        run_serial_tournament(args.experiment_name, args.bestof, args.models)
+        asyncio.run(run_serial_tournament(args.experiment_name, args.bestof, args.models, args.concurrency, args.move_cache))